@@ -0,0 +1,146 @@
+"""
+A module providing circuit breakers for the external services the application uses.
+
+After too many consecutive failures a breaker opens and calls are rejected right away,
+without reaching the service, until the reset timeout expires. Then a single trial call
+is let through: its success closes the breaker again, its failure re-opens it.
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from os import getenv
+from typing import Callable, List
+
+CLOSED = 'closed'
+HALF_OPEN = 'half-open'
+OPEN = 'open'
+
+# Numeric value of each state, as exposed in the metrics.
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_breakers: List[CircuitBreaker] = []
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open, the service is considered unavailable."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Circuit breaker guarding the calls to a single service.
+
+    :param name: The service name, used in logs and metrics.
+    :param is_failure: Tells whether an exception raised by a call is a service failure.
+        Other exceptions are still raised but do not count against the service.
+    :param failure_threshold: Consecutive failures opening the breaker.
+    :param reset_timeout: Seconds the breaker stays open before a trial call.
+    """
+
+    def __init__(self, name: str,
+                 is_failure: Callable[[Exception], bool],
+                 failure_threshold: int | None = None,
+                 reset_timeout: float | None = None):
+        self.name = name
+        self.is_failure = is_failure
+        self.failure_threshold = failure_threshold or int(
+            getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+        self.reset_timeout = reset_timeout or float(getenv('BREAKER_RESET_TIMEOUT', '30'))
+        self.failures_total = 0
+        self.rejected_total = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        _breakers.append(self)
+
+    @property
+    def state(self) -> str:
+        """
+        The current state of the breaker.
+        """
+        if self._failures < self.failure_threshold:
+            return CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        Calls the given function through the breaker.
+
+        :raises CircuitOpenError: If the breaker is open, the function is not called.
+        """
+        trial = self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            self._after_call(failed=self.is_failure(error), trial=trial)
+            raise
+
+        self._after_call(failed=False, trial=trial)
+        return result
+
+    def _before_call(self) -> bool:
+        """
+        Checks whether a call can go through and if it is the trial call.
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+
+            self.rejected_total += 1
+            retry_after = self.reset_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(self.name, max(retry_after, 1))
+
+    def _after_call(self, failed: bool, trial: bool):
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if not failed:
+                if self._failures >= self.failure_threshold:
+                    logging.info("Circuit '%s': Closed.", self.name)
+                self._failures = 0
+                return
+
+            self.failures_total += 1
+            self._failures += 1
+            if trial or self._failures == self.failure_threshold:
+                logging.warning("Circuit '%s': Open for %ss.", self.name, self.reset_timeout)
+                self._failures = max(self._failures, self.failure_threshold)
+                self._opened_at = time.monotonic()
+
+
+def metrics() -> str:
+    """
+    Returns the state and counters of all the circuit breakers, in Prometheus text format.
+    """
+    lines = [
+        '# HELP swa_circuit_breaker_state Breaker state (0: closed, 1: half-open, 2: open).',
+        '# TYPE swa_circuit_breaker_state gauge',
+    ]
+    lines += [f'swa_circuit_breaker_state{{name="{b.name}"}} {STATE_VALUES[b.state]}'
+              for b in _breakers]
+    lines += [
+        '# HELP swa_circuit_breaker_failures_total Failed calls to the service.',
+        '# TYPE swa_circuit_breaker_failures_total counter',
+    ]
+    lines += [f'swa_circuit_breaker_failures_total{{name="{b.name}"}} {b.failures_total}'
+              for b in _breakers]
+    lines += [
+        '# HELP swa_circuit_breaker_rejected_total Calls rejected while the breaker was open.',
+        '# TYPE swa_circuit_breaker_rejected_total counter',
+    ]
+    lines += [f'swa_circuit_breaker_rejected_total{{name="{b.name}"}} {b.rejected_total}'
+              for b in _breakers]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,188 @@
+"""
+A module providing an opt-in profiler for the HTTP routes.
+
+A sample of the requests is profiled with `cProfile`, the collected statistics are
+aggregated per route, kept in memory for the admin pages and dumped to disk so they
+can be inspected with any `pstats` compatible tool (eg: snakeviz).
+
+Since Python 3.12 `cProfile` records the calls of every thread, not just the one that
+started it: profiles are only accurate with a single-threaded server, like the default
+one used by `swa_http.py`. Under a threaded server they mix in concurrent requests.
+
+Routes returning a generator (eg: streamed pages) do most of their work while the
+response is being sent, so their profile also covers the iteration of the body.
+"""
+
+from __future__ import annotations
+import cProfile
+import functools
+import io
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import threading
+import types
+from typing import Dict
+
+import bottle
+
+# Directory where the aggregated profiles are dumped.
+PROFILE_DIR = os.path.join('.cache', 'profiles')
+
+# Profiles are dumped on the first sample of a route, then once every this many samples.
+DUMP_EVERY = 10
+
+
+class ProfilerPlugin:
+    """
+    Bottle plugin profiling a sample of the requests.
+
+    :param sample_rate: The fraction of requests to profile, from 0 (none) to 1 (all).
+    :param profile_dir: The directory where the aggregated profiles are dumped.
+    """
+    name = 'profiler'
+    api = 2
+
+    def __init__(self, sample_rate: float, profile_dir: str = PROFILE_DIR):
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._requests: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        # Only a single profiler can be active at any given time, requests
+        # served while another one is being profiled are simply not sampled.
+        self._profiler_lock = threading.Lock()
+
+    def apply(self, callback, route: bottle.Route):
+        """
+        Wraps the route callback, when sampling is enabled.
+        """
+        if self.sample_rate <= 0:
+            return callback
+
+        route_key = f'{route.method} {route.rule}'
+
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            if random.random() >= self.sample_rate:
+                return callback(*args, **kwargs)
+            if not self._profiler_lock.acquire(blocking=False):  # pylint: disable=R1732
+                return callback(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(callback, *args, **kwargs)
+            except BaseException:
+                self._finish(route_key, profiler)
+                raise
+
+            if isinstance(result, types.GeneratorType):
+                return _ProfiledBody(result, profiler, functools.partial(
+                    self._finish, route_key, profiler
+                ))
+
+            self._finish(route_key, profiler)
+            return result
+
+        return wrapper
+
+    def routes(self) -> Dict[str, int]:
+        """
+        Returns the profiled routes with the amount of requests sampled for each.
+        """
+        with self._stats_lock:
+            return dict(self._requests)
+
+    def report(self, route_key: str, limit: int = 40) -> str | None:
+        """
+        Returns the aggregated statistics of a route as text, sorted by cumulative time.
+
+        :param route_key: The route, as "<METHOD> <rule>" (eg: "GET /run").
+        :param limit: The maximum amount of functions to list.
+        :return: The report or None if the route was never profiled.
+        """
+        with self._stats_lock:
+            if route_key not in self._stats:
+                return None
+            output = io.StringIO()
+            stats = self._stats[route_key]
+            stats.stream = output
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            return output.getvalue()
+
+    def flush(self):
+        """
+        Dumps the aggregated profiles of all the routes to disk.
+        """
+        with self._stats_lock:
+            routes = list(self._stats)
+        for route_key in routes:
+            self._dump(route_key)
+
+    def _finish(self, route_key: str, profiler: cProfile.Profile):
+        self._profiler_lock.release()
+        self._record(route_key, profiler)
+
+    def _record(self, route_key: str, profiler: cProfile.Profile):
+        with self._stats_lock:
+            self._requests[route_key] = self._requests.get(route_key, 0) + 1
+            if route_key in self._stats:
+                self._stats[route_key].add(profiler)
+            else:
+                self._stats[route_key] = pstats.Stats(profiler)
+            dump = self._requests[route_key] % DUMP_EVERY == 1
+
+        if dump:
+            self._dump(route_key)
+
+    def _dump(self, route_key: str):
+        with self._stats_lock:
+            data = marshal.dumps(self._stats[route_key].stats)
+
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(self._profile_path(route_key), mode='wb') as file:
+                file.write(data)
+        except OSError:
+            logging.exception("Could not dump the profile for '%s'", route_key)
+
+    def _profile_path(self, route_key: str) -> str:
+        filename = re.sub(r'[^\w.-]+', '_', route_key).strip('_')
+        return os.path.join(self.profile_dir, f'{filename}.prof')
+
+
+class _ProfiledBody:
+    """
+    Response body profiling each step of the wrapped generator, until it is closed.
+    The server closes the body once it is sent, even when it is not fully consumed.
+
+    :param body: The generator returned by the route.
+    :param profiler: The profiler of the request.
+    :param on_close: Called once, when the body is closed.
+    """
+
+    def __init__(self, body: types.GeneratorType, profiler: cProfile.Profile, on_close):
+        self._body = body
+        self._profiler = profiler
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._profiler.runcall(next, self._body)
+
+    def close(self):
+        """
+        Closes the wrapped generator and completes the profile of the request.
+        """
+        if self._on_close is None:
+            return
+        try:
+            self._profiler.runcall(self._body.close)
+        finally:
+            self._on_close()
+            self._on_close = None
@@ -0,0 +1,78 @@
+"""
+A module to encode session and cache data in a versioned binary format.
+
+Every payload starts with a single header byte, holding the format version and
+whether the body is compressed. The body is compact JSON, compressed with zlib when
+it is large enough and compresses well: large repetitive values (eg: playlist lists)
+shrink to about a quarter of their size, everything else stays about as big as plain
+JSON. Encoding is slower than plain JSON for every payload, including the bare
+`{email, playlist_id}` sessions stored today, and decoding is at best as fast: the
+format only pays off once large values are cached in the session. Payloads starting
+with "{" are the plain JSON used before this format existed and are still decoded
+transparently.
+"""
+
+from __future__ import annotations
+import json
+import zlib
+
+FORMAT_VERSION = 1
+
+# Bodies smaller than this are never compressed, zlib would hardly save anything.
+COMPRESSION_THRESHOLD = 4096
+
+# Compressed bodies are only kept if at most this fraction of the original size:
+# hardly compressible data (eg: lists of random IDs) is cheaper to decode as is.
+COMPRESSION_MAX_RATIO = 0.5
+
+# Favour speed, payloads are encoded on every request writing the session.
+COMPRESSION_LEVEL = 1
+
+_FLAG_ZLIB = 0x01
+_LEGACY_JSON = ord('{')
+
+
+def encode(data: dict) -> bytes:
+    """
+    Encodes the given data in the current format.
+
+    :param data: The data to encode, must be JSON serializable.
+    :return: The encoded payload.
+    """
+    flags = 0
+    body = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode()
+    if len(body) >= COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(body, COMPRESSION_LEVEL)
+        if len(compressed) <= len(body) * COMPRESSION_MAX_RATIO:
+            body = compressed
+            flags |= _FLAG_ZLIB
+
+    return bytes((FORMAT_VERSION << 1 | flags,)) + body
+
+
+def decode(payload: bytes | str) -> dict:
+    """
+    Decodes a payload in any known format, including the legacy plain JSON.
+
+    :param payload: The encoded payload.
+    :return: The decoded data.
+    :raises ValueError: If the payload is corrupted or from an unknown format version.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+
+    if not payload or payload[0] == _LEGACY_JSON:
+        return json.loads(payload)
+
+    version, flags = payload[0] >> 1, payload[0] & _FLAG_ZLIB
+    if not 1 <= version <= FORMAT_VERSION:
+        raise ValueError(f'Unsupported format version: {version}')
+
+    body = payload[1:]
+    if flags & _FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as error:
+            raise ValueError('Corrupted payload') from error
+
+    return json.loads(body)
@@ -4,7 +4,8 @@ A module to manage user sessions.
 
 This module provides classes and functions to manage user sessions.
 It now supports storing the data in Redis, and falls back to file-based storage
-when REDIS_URL is not provided.
+when REDIS_URL is not provided. Data is stored with `swa.serialization`, sessions
+stored as plain JSON by older versions are still read and converted on write.
 """
 
 from __future__ import annotations
@@ -13,8 +14,9 @@ import random
 import string
 import os
 import bottle
+from swa import serialization
 from swa.spotifyoauthredis import access_token
-from swa.utils import redis_client, redis_session_data_key
+from swa.utils import redis_get, redis_set, redis_session_data_key
 
 COOKIE_SECRET = str(os.getenv("SPOTIPY_CLIENT_SECRET", "default"))
 
@@ -31,15 +33,16 @@ def is_redis_enabled() -> bool:
     return 'REDIS_URL' in os.environ
 
 
-def get_file_storage_path(session_id: str) -> str:
+def get_file_storage_path(session_id: str, extension: str = 'session') -> str:
     """
     Returns the file path for the given session ID.
 
     :param session_id: The session ID.
+    :param extension: The file extension, 'json' for sessions stored by older versions.
 
     :return: The file path for the given session ID.
     """
-    return os.path.join(FILE_STORAGE_PATH, f'{session_id}.json')
+    return os.path.join(FILE_STORAGE_PATH, f'{session_id}.{extension}')
 
 
 class SessionData:
@@ -48,6 +51,7 @@ class SessionData:
 
     :param data: The session data as a dictionary. If not provided, an empty dictionary is used.
     """
+    __slots__ = ('_data',)
 
     def __init__(self, data=None):
         if data is None:
@@ -55,6 +59,9 @@ class SessionData:
         self._data = data
 
     def __getattr__(self, key):
+        if key == '_data':
+            raise AttributeError(key)
+
         if key in self._data:
             return self._data[key]
 
@@ -68,17 +75,31 @@ class SessionData:
             value (any): The data
 
         Returns:
-            self: Self
+            SessionData: A new instance with the data added, this one is left untouched.
         """
-        _d = self._data
-        _d[key] = value
-        return self.__class__(data=_d)
+        return self.__class__(data={**self._data, key: value})
 
     def all(self) -> dict:
         """
-        Returns all the session data as a dictionary.
+        Returns a copy of all the session data as a dictionary.
         """
-        return self._data
+        return dict(self._data)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes | str) -> SessionData:
+        """
+        Returns a new `SessionData` instance from the given encoded payload.
+
+        :param payload: The payload to decode, see `swa.serialization`.
+        :return: The new `SessionData` instance.
+        """
+        return cls(data=serialization.decode(payload))
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the `SessionData` instance, see `swa.serialization`.
+        """
+        return serialization.encode(self._data)
 
     @classmethod
     def from_json(cls, json_str: str) -> SessionData:
@@ -111,12 +132,8 @@ def session_start() -> str:
     # Initialize empty session data
     if not is_redis_enabled():
         os.makedirs(FILE_STORAGE_PATH, exist_ok=True)
-        with open(
-            get_file_storage_path(session_id),
-            mode='w',
-            encoding='utf-8',
-        ) as file:
-            json.dump({}, file)
+        with open(get_file_storage_path(session_id), mode='wb') as file:
+            file.write(SessionData().to_bytes())
 
     return session_id
 
@@ -152,19 +169,16 @@ def session_get_data(session_id: str = None) -> SessionData:
         raise RuntimeError('No valid session and no session_id provided!')
 
     if is_redis_enabled():
-        redis_data = redis_client().get(redis_session_data_key(session_id))
+        redis_data = redis_get(redis_session_data_key(session_id), decode_responses=False)
         if redis_data:
-            return SessionData.from_json(redis_data)
+            return SessionData.from_bytes(redis_data)
     else:
-        try:
-            with open(
-                get_file_storage_path(session_id),
-                mode='r',
-                encoding='utf-8',
-            ) as file:
-                return SessionData(json.load(file))
-        except FileNotFoundError:
-            return SessionData()
+        for extension in ('session', 'json'):
+            try:
+                with open(get_file_storage_path(session_id, extension), mode='rb') as file:
+                    return SessionData.from_bytes(file.read())
+            except FileNotFoundError:
+                continue
 
     return SessionData()
 
@@ -188,16 +202,16 @@ def session_set_data(data: SessionData, session_id: str = None) -> bool:
 
     if is_redis_enabled():
         redis_key = redis_session_data_key(session_id)
-        redis_data = data.to_json()
-        return redis_client().set(name=redis_key, value=redis_data)
+        redis_data = data.to_bytes()
+        return redis_set(redis_key, redis_data)
 
     os.makedirs(FILE_STORAGE_PATH, exist_ok=True)
-    with open(
-        get_file_storage_path(session_id),
-        mode='w',
-        encoding='utf-8',
-    ) as file:
-        json.dump(data.all(), file)
+    with open(get_file_storage_path(session_id), mode='wb') as file:
+        file.write(data.to_bytes())
+
+    legacy_path = get_file_storage_path(session_id, 'json')
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
     return True
 
 
@@ -7,10 +7,14 @@ It also provides several custom error classes for handling common errors.
 """
 
 import logging
+import re
 
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from spotipy import Spotify
 
+SPOTIFY_ID_PATTERN = re.compile(r'^[0-9A-Za-z]{22}$')
+
 
 class SwaError(RuntimeError):
     """Generic App error."""
@@ -32,6 +36,48 @@ class DiscoverWeeklyMultipleMatchesError(DiscoverWeeklyError):
     """Playlist 'Discover Weekly' has multiple matches."""
 
 
+class AlbumFilter:  # pylint: disable=too-few-public-methods
+    """Decides which albums are worth expanding into the albums playlist.
+
+    Args:
+        album_types (Iterable[str], optional): Accepted album types, any of "album",
+            "single" and "compilation". If not provided all types are accepted.
+        min_tracks (int): Minimum amount of tracks an album must have.
+        max_tracks (int, optional): Maximum amount of tracks an album can have.
+        exclude_compilations (bool): Whether to reject compilations.
+    """
+
+    def __init__(self, album_types: Optional[Iterable[str]] = None,
+                 min_tracks: int = 0,
+                 max_tracks: Optional[int] = None,
+                 exclude_compilations: bool = False):
+        self.album_types = set(album_types) if album_types else None
+        self.min_tracks = min_tracks
+        self.max_tracks = max_tracks
+        self.exclude_compilations = exclude_compilations
+
+    def accepts(self, album: Dict) -> bool:
+        """
+        Checks a (simplified) album object against the filter.
+        Data missing from the album object is never a reason to reject it.
+        """
+        album_type = album.get('album_type')
+        if album_type:
+            if self.exclude_compilations and album_type == 'compilation':
+                return False
+            if self.album_types is not None and album_type not in self.album_types:
+                return False
+
+        total_tracks = album.get('total_tracks')
+        if total_tracks is not None:
+            if total_tracks < self.min_tracks:
+                return False
+            if self.max_tracks is not None and total_tracks > self.max_tracks:
+                return False
+
+        return True
+
+
 class SwaRunner:
     """A class to run a script that fetches tracks from the user's "Discover Weekly" playlist,
     and adds them to a new playlist with only albums.
@@ -40,6 +86,10 @@ class SwaRunner:
         client (Spotify): The Spotify API client object.
         discover_weekly_id (str, optional): The ID of the "Discover Weekly" playlist.
             If not provided, the script will try to find it automatically.
+        extra_playlists (List[str], optional): Additional playlists, by name or ID, whose
+            albums are added next to the "Discover Weekly" ones (eg: "Release Radar").
+        album_filter (AlbumFilter, optional): Filter for the albums to expand.
+            If not provided all albums are accepted.
 
     Attributes:
         _special_playlist (Dict[str, str]): The name description of the playlist to create.
@@ -47,26 +97,37 @@ class SwaRunner:
         _user (Dict): The user data.
         _spy_client (Spotify): The Spotify API client object.
         _discover_weekly_id (str): The ID of the "Discover Weekly" playlist.
+        _extra_playlists (List[str]): Names or IDs of the additional source playlists.
+        _album_filter (AlbumFilter): Filter for the albums to expand.
     """
     _special_playlist: Dict[str, str] = {
         'name': 'Discover Weekly Albums',
         'desc': 'Contains the "Discovery Weekly", but with albums',
     }
 
+    # Maximum amount of IDs accepted by the "Get Several Albums" endpoint.
+    _albums_batch_size: int = 20
+    # Maximum amount of tracks that can be added to a playlist with a single request.
+    _tracks_batch_size: int = 100
+
     def __init__(self, client: Spotify,
-                 discover_weekly_id: Optional[str] = None):
+                 discover_weekly_id: Optional[str] = None,
+                 extra_playlists: Optional[List[str]] = None,
+                 album_filter: Optional[AlbumFilter] = None):
         self._cache: Dict[str, object] = {}
         self._user: Optional[Dict] = None
         self._spy_client: Spotify = client
         self._discover_weekly_id = discover_weekly_id if discover_weekly_id else None
+        self._extra_playlists: List[str] = list(extra_playlists or [])
+        self._album_filter: AlbumFilter = album_filter or AlbumFilter()
 
     def run(self):
         """
         Main runtime.
         """
         album_playlist = self.prepare_weekly_album_playlist()
-        album_ids = self.get_weekly_albums_ids()
-        tracks = self.get_all_albums_tracks(album_ids)
+        album_ids = self.get_sources_albums_ids()
+        tracks = self.iter_albums_tracks(album_ids)
         self.add_tracks_to_playlist(album_playlist['id'], tracks)
 
     def get_user(self) -> Dict:
@@ -93,14 +154,36 @@ class SwaRunner:
         """
         key: str = 'user_playlists'
         if key not in self._cache or self._cache[key] is None:
-            self._cache[key] = self._spy_client.current_user_playlists()[
-                'items']
+            self._cache[key] = [
+                playlist
+                for playlists in self.iter_user_playlists_pages()
+                for playlist in playlists
+            ]
 
         if sort_by_author:
             return self._sort_playlists_by_author(self._cache[key])
 
         return self._cache[key]
 
+    def iter_user_playlists_pages(self) -> Iterator[List[Dict]]:
+        """
+        Yields the user playlists one page at a time, as soon as each page is fetched.
+        """
+        page = self._spy_client.current_user_playlists()
+        while page:
+            yield [playlist for playlist in page['items'] if playlist]
+            page = self._spy_client.next(page) if page.get('next') else None
+
+    def iter_user_playlists_by_author(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Yields the user playlists grouped by author, as (author, playlists) pairs.
+
+        Playlists are grouped one page at a time, so the same author can be
+        yielded more than once when their playlists span multiple pages.
+        """
+        for playlists in self.iter_user_playlists_pages():
+            yield from self._sort_playlists_by_author(playlists).items()
+
     def get_playlist_by_name(self, name: str,
                              multiple: bool = False) -> List[Dict]:
         """
@@ -139,6 +222,25 @@ class SwaRunner:
 
         return self._cache[playlist_name] if allow_multiple else self._cache[playlist_name][0]
 
+    def get_source_playlist_ids(self) -> List[str]:
+        """
+        Lists the IDs of all the playlists to take the albums from, without duplicates.
+
+        The "Discover Weekly" comes first, followed by the extra playlists. Those are
+        matched by name among the user playlists first, then used as IDs if valid.
+        """
+        playlist_ids = [self.get_discover_weekly()['id']]
+        for source in self._extra_playlists:
+            playlist = self.get_playlist_by_name(source)
+            if playlist:
+                playlist_ids.append(playlist['id'])
+            elif SPOTIFY_ID_PATTERN.match(source):
+                playlist_ids.append(source)
+            else:
+                logging.warning("Source playlist '%s': Not found, skipping.", source)
+
+        return list(dict.fromkeys(playlist_ids))
+
     def prepare_weekly_album_playlist(self) -> dict:
         """
         Attempts to find the "Weekly Album discovery", cleaning it up is needed.
@@ -184,46 +286,98 @@ class SwaRunner:
             tracks=tracks
         )
 
-    def get_weekly_albums_ids(self):
+    def get_weekly_albums_ids(self) -> List[str]:
         """
         Gets all the album IDs for the songs contained in the Discover Weekly playlist
         """
         playlist = self.get_discover_weekly()
-        tracks = self._spy_client.playlist_tracks(
-            playlist_id=playlist['id'],
-            fields='items(track(id,album(id)))',
+        return self._filter_albums_ids([playlist['id']])
+
+    def get_sources_albums_ids(self) -> List[str]:
+        """
+        Gets the album IDs for the songs contained in all the source playlists,
+        each album is listed only once and in order of first appearance.
+        """
+        return self._filter_albums_ids(self.get_source_playlist_ids())
+
+    def _filter_albums_ids(self, playlist_ids: Iterable[str]) -> List[str]:
+        """
+        Lists the IDs of the albums in the given playlists accepted by the album filter.
+
+        The filter only relies on the album data returned with the playlist tracks,
+        so rejected albums do not cost any extra request.
+        """
+        checked: Dict[str, bool] = {}
+        for playlist_id in playlist_ids:
+            for album in self._iter_playlist_albums(playlist_id):
+                if album['id'] not in checked:
+                    checked[album['id']] = self._album_filter.accepts(album)
+                    if not checked[album['id']]:
+                        logging.debug("Album '%s': Rejected by filter.", album['id'])
+
+        return [album_id for album_id, accepted in checked.items() if accepted]
+
+    def _iter_playlist_albums(self, playlist_id: str) -> Iterator[Dict]:
+        first_page = self._spy_client.playlist_tracks(
+            playlist_id=playlist_id,
+            fields='items(track(album(id,album_type,total_tracks))),next',
         )
-        return [t['track']['album']['id'] for t in tracks['items']]
+        for item in self._iter_pages(first_page):
+            # Local files and unavailable tracks come without a track or album.
+            album = (item.get('track') or {}).get('album') or {}
+            if album.get('id'):
+                yield album
 
-    def get_all_albums_tracks(self, album_ids: list):
+    def get_all_albums_tracks(self, album_ids: list) -> List[str]:
         """
         Retrurns all the tracks for a list of album IDs
         """
-        tracks = []
-        for album_id in album_ids:
-            tracks.extend(
-                [t['id'] for t in self._spy_client.album_tracks(album_id)['items']])
+        return list(self.iter_albums_tracks(album_ids))
 
-        return tracks
+    def iter_albums_tracks(self, album_ids: Iterable[str]) -> Iterator[str]:
+        """
+        Yields the IDs of all the tracks for a list of album IDs, each track only once.
 
-    def add_tracks_to_playlist(self, playlist_id: str, tracks: list):
+        Albums are fetched in batches, the first page of tracks is included in the
+        album object so only albums with many tracks need any extra request.
+        """
+        seen_tracks = set()
+        for chunk in SwaRunner.divide_chunks(album_ids, self._albums_batch_size):
+            for album in self._spy_client.albums(chunk)['albums']:
+                if not album:
+                    continue
+                for track in self._iter_pages(album['tracks']):
+                    if track['id'] and track['id'] not in seen_tracks:
+                        seen_tracks.add(track['id'])
+                        yield track['id']
+
+    def add_tracks_to_playlist(self, playlist_id: str, tracks: Iterable[str]):
         """
         Given a list of tracks and a playlists it appends them to such playloist.
         """
-        for chunk in list(SwaRunner.divide_chunks(tracks, 100)):
+        for chunk in SwaRunner.divide_chunks(tracks, self._tracks_batch_size):
             self._spy_client.user_playlist_add_tracks(
                 user=self.get_username(),
                 playlist_id=playlist_id,
                 tracks=chunk
             )
 
+    def _iter_pages(self, page: Optional[Dict]) -> Iterator[Dict]:
+        """
+        Yields the items of a paged result, following it to the last page.
+        """
+        while page:
+            yield from page['items']
+            page = self._spy_client.next(page) if page.get('next') else None
+
     @staticmethod
-    def divide_chunks(items: list, size: int):
+    def divide_chunks(items: Iterable, size: int):
         """
-        Generator to split a list in chunks of a given size.
+        Generator to split a list, or any iterable, in chunks of a given size.
         """
-        for i in range(0, len(items), size):
-            yield items[i:i + size]
+        iterator = iter(items)
+        while chunk := list(islice(iterator, size)):
+            yield chunk
 
     @staticmethod
     def _sort_playlists_by_author(playlists: dict) -> dict:
@@ -5,15 +5,82 @@ This module contains functions for handling Spotify OAuth and cached access toke
 from os import getenv
 
 import hashlib
+import json
 import logging
-import redis
+import requests
 import spotipy
 
-from swa.utils import http_server_info
+from swa.circuit import CircuitBreaker
+from swa.utils import http_server_info, redis_get, redis_set
 
 OAUTH_GRANTS = "playlist-read-private playlist-modify-public playlist-modify-private"
 
 
+def is_spotify_failure(error: Exception) -> bool:
+    """
+    Tells whether an error means Spotify is unavailable, rather than a bad request.
+    """
+    if isinstance(error, spotipy.SpotifyException):
+        return error.http_status >= 500 or error.http_status == 429
+
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+SPOTIFY_BREAKER = CircuitBreaker('spotify', is_failure=is_spotify_failure)
+
+
+class BreakerSpotify(spotipy.Spotify):
+    """
+    Spotify API client sending every request through the Spotify circuit breaker.
+    """
+
+    def _internal_call(self, method, url, payload, params):
+        return SPOTIFY_BREAKER.call(super()._internal_call, method, url, payload, params)
+
+
+class BreakerSession(requests.Session):
+    """
+    Requests session sending every request through the Spotify circuit breaker,
+    used for the OAuth token requests. Server errors count as failures too.
+    """
+
+    def request(self, *args, **kwargs):
+        return SPOTIFY_BREAKER.call(self._checked_request, *args, **kwargs)
+
+    def _checked_request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response
+
+
+class RedisFallbackCacheHandler(spotipy.cache_handler.CacheHandler):
+    """
+    Stores the token info in Redis, falling back to the local cache while Redis is
+    unavailable instead of losing track of the logged in user.
+
+    Args:
+        key (str): The Redis key for the token info.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def get_cached_token(self):
+        token_info = redis_get(self.key)
+        return json.loads(token_info) if token_info else None
+
+    def save_token_to_cache(self, token_info):
+        redis_set(self.key, json.dumps(token_info))
+
+
+def spotify_timeout() -> float:
+    """
+    Returns the seconds to wait for Spotify to answer a request.
+    """
+    return float(getenv('SPOTIFY_TIMEOUT', '5'))
+
+
 def spotify_oauth(email: str) -> spotipy.SpotifyOAuth:
     """
     Get a SpotifyOAuth object using the provided email.
@@ -37,22 +104,50 @@ def spotify_oauth(email: str) -> spotipy.SpotifyOAuth:
 
     cache_handler = None
     if getenv('REDIS_URL'):
-        rclient = redis.Redis().from_url(url=getenv('REDIS_URL'), decode_responses=True)
-        cache_handler = spotipy.cache_handler.RedisCacheHandler(
-            rclient,
-            '-'.join(('swa-user', email)),
-        )
+        cache_handler = RedisFallbackCacheHandler('-'.join(('swa-user', email)))
     else:
         cache_path = f'.cache/user-{hashlib.sha1(email.encode()).hexdigest()}'
         cache_handler = spotipy.oauth2.CacheFileHandler(cache_path)
 
-    return spotipy.SpotifyOAuth(
+    oauth = spotipy.SpotifyOAuth(
         client_id=client_id,
         client_secret=client_secret,
         redirect_uri=redirect_url,
         scope=OAUTH_GRANTS,
-        cache_handler=cache_handler
+        cache_handler=cache_handler,
+        requests_session=BreakerSession(),
+        requests_timeout=spotify_timeout(),
     )
+    accounts_url = getenv('SPOTIFY_ACCOUNTS_URL')
+    if accounts_url:
+        oauth.OAUTH_AUTHORIZE_URL = f'{accounts_url}/authorize'
+        oauth.OAUTH_TOKEN_URL = f'{accounts_url}/api/token'
+
+    return oauth
+
+
+def spotify_client(token: str) -> spotipy.Spotify:
+    """
+    Get a Spotify API client authenticated with the provided access token,
+    failing fast while Spotify is unavailable: requests are not retried, the
+    circuit breaker decides when to try again.
+
+    Args:
+        token (str): The user access token.
+
+    Returns:
+        spotipy.Spotify: A Spotify API client.
+    """
+    client = BreakerSpotify(
+        auth=token,
+        requests_timeout=spotify_timeout(),
+        retries=0,
+        status_retries=0,
+    )
+    if getenv('SPOTIFY_API_URL'):
+        client.prefix = getenv('SPOTIFY_API_URL')
+
+    return client
 
 
 def access_token(email: str) -> str or None:
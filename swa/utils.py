@@ -1,22 +1,118 @@
 """
 Module containing utility functions used by the main application.
 """
+from collections import OrderedDict
 from os import getenv
+import functools
+import logging
+import threading
+import time
 import redis
 
+from swa.circuit import CircuitBreaker, CircuitOpenError
+
 COOKIE_SECRET = str(getenv("SPOTIPY_CLIENT_SECRET", "default"))
 
+REDIS_BREAKER = CircuitBreaker(
+    'redis',
+    is_failure=lambda error: isinstance(error, redis.RedisError),
+)
+
 
-def redis_client() -> redis.Redis:
+class LocalCache:
     """
-    Returns a Redis client instance.
+    Short-lived in-process cache, used in place of Redis while it is unavailable.
+
+    :param ttl: Seconds an entry is kept after it was last stored.
     """
-    rclient = redis.Redis().from_url(
-        url=getenv('REDIS_URL'),
-        decode_responses=True,
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # Entries are kept in the order they were stored, so the first ones expire first.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Returns the value stored for the key, or None if missing or expired.
+        """
+        with self._lock:
+            expires_at, value = self._entries.get(key, (0, None))
+            if expires_at > time.monotonic():
+                return value
+
+            self._entries.pop(key, None)
+            return None
+
+    def set(self, key: str, value):
+        """
+        Stores the value for the key, dropping the expired entries.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while self._entries and next(iter(self._entries.values()))[0] <= now:
+                self._entries.popitem(last=False)
+
+
+_fallback_cache = LocalCache(ttl=float(getenv('LOCAL_CACHE_TTL', '300')))
+
+
+def redis_client(decode_responses: bool = True) -> redis.Redis:
+    """
+    Returns a Redis client instance, sharing its connection pool with the previous ones.
+
+    :param decode_responses: Whether responses are decoded to strings, disable for binary data.
+    """
+    return _redis_client(getenv('REDIS_URL'), decode_responses)
+
+
+@functools.lru_cache(maxsize=None)
+def _redis_client(url: str, decode_responses: bool) -> redis.Redis:
+    timeout = float(getenv('REDIS_TIMEOUT', '1'))
+    return redis.Redis.from_url(
+        url=url,
+        decode_responses=decode_responses,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
     )
-    rclient.ping()
-    return rclient
+
+
+def redis_get(key: str, decode_responses: bool = True):
+    """
+    Gets a value from Redis through its circuit breaker.
+    While Redis is unavailable the value comes from the local cache instead.
+
+    :param key: The Redis key.
+    :param decode_responses: Whether the value is decoded to a string.
+    :return: The value, or None if not found.
+    """
+    try:
+        value = REDIS_BREAKER.call(redis_client(decode_responses).get, key)
+    except (CircuitOpenError, redis.RedisError) as error:
+        logging.warning('Redis unavailable, reading from the local cache: %s', error)
+        return _fallback_cache.get(key)
+
+    if value is not None:
+        _fallback_cache.set(key, value)
+    return value
+
+
+def redis_set(key: str, value) -> bool:
+    """
+    Sets a value in Redis through its circuit breaker, and in the local cache.
+
+    :param key: The Redis key.
+    :param value: The value to store.
+    :return: True if the value was stored in Redis, False if only in the local cache.
+    """
+    _fallback_cache.set(key, value)
+    try:
+        return bool(REDIS_BREAKER.call(redis_client().set, key, value))
+    except (CircuitOpenError, redis.RedisError) as error:
+        logging.warning('Redis unavailable, writing to the local cache only: %s', error)
+        return False
 
 
 def redis_session_data_key(sid: str) -> str:
@@ -36,6 +132,69 @@ def http_server_info() -> tuple:
     return getenv("LISTEN_IP", '127.0.1.1'), getenv("PORT", '8080')
 
 
+def extra_source_playlists() -> list:
+    """
+    Returns the names or IDs of the playlists to take albums from, next to "Discover Weekly".
+    """
+    sources = getenv('EXTRA_SOURCE_PLAYLISTS', '').split(',')
+    return [source.strip() for source in sources if source.strip()]
+
+
+ALBUM_TYPES = ('album', 'single', 'compilation')
+
+
+@functools.lru_cache(maxsize=None)
+def album_filter_options() -> dict:
+    """
+    Returns the album filter options, as keyword arguments for `AlbumFilter`.
+    Options are parsed once, the first call validates them.
+
+    :raises ValueError: If any of the options is invalid.
+    """
+    album_types = [t.strip() for t in getenv('ALBUM_TYPES', '').split(',') if t.strip()]
+    unknown_types = set(album_types) - set(ALBUM_TYPES)
+    if unknown_types:
+        raise ValueError(f"Invalid ALBUM_TYPES: {', '.join(sorted(unknown_types))}, "
+                         f"accepted values are: {', '.join(ALBUM_TYPES)}")
+
+    try:
+        max_tracks = getenv('ALBUM_MAX_TRACKS')
+        return {
+            'album_types': album_types,
+            'min_tracks': int(getenv('ALBUM_MIN_TRACKS', '0')),
+            'max_tracks': int(max_tracks) if max_tracks else None,
+            'exclude_compilations': bool(getenv('EXCLUDE_COMPILATIONS')),
+        }
+    except ValueError as error:
+        raise ValueError(f'Invalid ALBUM_MIN_TRACKS or ALBUM_MAX_TRACKS: {error}') from error
+
+
+@functools.lru_cache(maxsize=None)
+def profile_sample_rate() -> float:
+    """
+    Returns the fraction of requests to profile, 0 when profiling is disabled.
+    The rate is parsed once, the first call validates it.
+
+    :raises ValueError: If the rate is not a number between 0 and 1.
+    """
+    value = getenv('PROFILE_SAMPLE_RATE', '0')
+    try:
+        sample_rate = float(value)
+    except ValueError as error:
+        raise ValueError(f'Invalid PROFILE_SAMPLE_RATE: {value}, expected a number') from error
+
+    if not 0 <= sample_rate <= 1:
+        raise ValueError(f'Invalid PROFILE_SAMPLE_RATE: {value}, expected a number from 0 to 1')
+    return sample_rate
+
+
+def stream_manual_selection() -> bool:
+    """
+    Returns True if the manual selection page should be streamed while playlists are fetched.
+    """
+    return bool(getenv('STREAM_MANUAL_SELECTION'))
+
+
 def is_prod() -> bool:
     """
     Returns True if the application is running in production, or False for any other environment.
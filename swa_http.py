@@ -7,18 +7,48 @@ as well as for handling the redirect from Spotify after authorization, copying t
 Discover Weekly to the user's playlist,
 and displaying the page for manual selection of the playlist to copy tracks from.
 """
+import atexit
+import functools
+import hmac
 import logging
 import os
 import re
 import sys
 
 import bottle
+import requests
+import spotipy
 
+import swa.circuit as swcircuit
+import swa.profiling as swprof
 import swa.session as sws
 import swa.spotifyoauthredis as swoauth
 import swa.spotify_weekly as sw
 import swa.utils as swutil
 
+# The sample rate is set by `main`, once the settings are validated.
+profiler = swprof.ProfilerPlugin(
+    sample_rate=0,
+    profile_dir=os.getenv('PROFILE_DIR', swprof.PROFILE_DIR),
+)
+
+
+def degraded_mode(callback):
+    """
+    Plugin serving the "try again later" page right away while a circuit breaker is open.
+    """
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        try:
+            return callback(*args, **kwargs)
+        except swcircuit.CircuitOpenError as error:
+            logging.info(error)
+            bottle.response.status = 503
+            bottle.response.set_header('Retry-After', str(int(error.retry_after)))
+            return bottle.jinja2_template('unavailable.html.j2')
+
+    return wrapper
+
 
 @bottle.get('/')
 @bottle.jinja2_view('index.html.j2')
@@ -104,7 +134,12 @@ def run():
     """Runs the main program to copy tracks from Discover Weekly to the user's playlist."""
     (session_data, token) = sws.session_get_oauth_token()
     try:
-        sw.SwaRunner(sw.Spotify(auth=token), session_data.playlist_id).run()
+        sw.SwaRunner(
+            swoauth.spotify_client(token),
+            session_data.playlist_id,
+            extra_playlists=swutil.extra_source_playlists(),
+            album_filter=sw.AlbumFilter(**swutil.album_filter_options()),
+        ).run()
         bottle.redirect('/run/finished')
     except sw.DiscoverWeeklyError:
         bottle.redirect('/run/manual-selection')
@@ -115,7 +150,15 @@ def run():
 def run_manual_selection():
     """Renders the page for manual selection of the playlist to copy tracks from."""
     (_, token) = sws.session_get_oauth_token()
-    swa = sw.SwaRunner(sw.Spotify(auth=token))
+    swa = sw.SwaRunner(swoauth.spotify_client(token))
+    if swutil.stream_manual_selection():
+        # Looking for "Discover Weekly" requires all the playlists, so instead
+        # of waiting for them the page lists every playlist as it is fetched.
+        return stream_template(
+            'run-manual-selection.html.j2',
+            playlist_groups=StreamedPlaylistGroups(swa.iter_user_playlists_by_author()),
+        )
+
     user = swa.get_user()
     try:
         playlists = {'Spotify': swa.get_discover_weekly(allow_multiple=True)}
@@ -124,10 +167,44 @@ def run_manual_selection():
 
     return {
         'user': user,
-        'playlists': playlists,
+        'playlist_groups': playlists.items(),
     }
 
 
+class StreamedPlaylistGroups:  # pylint: disable=too-few-public-methods
+    """
+    Playlist groups consumed while the page is being sent, when the response status
+    is already out: errors are recorded so the page can be completed with a notice.
+
+    :param groups: The (author, playlists) pairs to stream.
+    """
+
+    def __init__(self, groups):
+        self._groups = groups
+        self.failed = False
+
+    def __iter__(self):
+        try:
+            yield from self._groups
+        except (spotipy.SpotifyException, requests.RequestException,
+                swcircuit.CircuitOpenError) as error:
+            logging.warning('Could not load all the playlists: %s', error)
+            self.failed = True
+
+
+def stream_template(name: str, **context):
+    """
+    Renders a template lazily, yielding the output as it is produced.
+    Any iterable in the context is consumed only while the page is being sent.
+    """
+    return _streaming_template(name).generate(**context)
+
+
+@functools.lru_cache(maxsize=None)
+def _streaming_template(name: str):
+    return bottle.Jinja2Template(name=name, lookup=bottle.TEMPLATE_PATH).tpl
+
+
 @bottle.post('/run/manual-selection')
 # @bottle.jinja2_view('run-manual-selection.html.j2')
 def do_run_manual_selection():
@@ -232,6 +309,53 @@ def static_assets(filename: str):
     )
 
 
+def require_admin():
+    """
+    Aborts the request unless it carries the admin token as a bearer token, in the
+    `Authorization` header. Admin pages do not exist without ADMIN_TOKEN.
+    """
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token:
+        bottle.abort(404)
+
+    auth_header = bottle.request.get_header('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        bottle.abort(403)
+
+    given_token = auth_header.removeprefix('Bearer ')
+    if not hmac.compare_digest(given_token.encode(), admin_token.encode()):
+        bottle.abort(403)
+
+
+@bottle.get('/admin/profiles')
+def admin_profiles():
+    """
+    Lists the profiled routes, or shows the aggregated profile of the `route` given.
+    """
+    require_admin()
+    bottle.response.content_type = 'text/plain; charset=utf-8'
+
+    route_key = bottle.request.query.get('route')
+    if not route_key:
+        return ''.join(f'{count}\t{key}\n' for key, count in profiler.routes().items())
+
+    report = profiler.report(route_key, limit=bottle.request.query.get('limit', 40, type=int))
+    if report is None:
+        bottle.abort(404, f'No profile for: {route_key}')
+
+    return report
+
+
+@bottle.get('/metrics')
+def metrics():
+    """
+    Exposes the application metrics, in Prometheus text format.
+    """
+    require_admin()
+    bottle.response.content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    return swcircuit.metrics()
+
+
 def check_requirements():
     """
     Checks if all requirements are met or quits.
@@ -247,6 +371,13 @@ def check_requirements():
                 file=sys.stderr)
             sys.exit(1)
 
+    try:
+        swutil.album_filter_options()
+        swutil.profile_sample_rate()
+    except ValueError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        sys.exit(1)
+
 
 def main():
     """
@@ -261,6 +392,13 @@ def main():
     if os.getenv('REDIRECT_HOST') is not None:
         logging.info("Oauth Host:\n\thttp://%s", os.getenv('REDIRECT_HOST'))
 
+    bottle.install(degraded_mode)
+    profiler.sample_rate = swutil.profile_sample_rate()
+    if profiler.sample_rate > 0:
+        logging.info("Profiling %d%% of the requests.", profiler.sample_rate * 100)
+        bottle.install(profiler)
+        atexit.register(profiler.flush)
+
     bottle.run(
         host=server_host, port=server_port,
         debug=enable_debug, reloader=(not swutil.is_prod())
@@ -0,0 +1,58 @@
+"""
+Microbenchmark comparing the plain JSON session encoding with `swa.serialization`.
+
+Run from the repository root:
+
+    python -m tools.bench_serialization
+"""
+
+import functools
+import json
+import random
+import string
+import timeit
+
+from swa import serialization
+
+
+def _spotify_id() -> str:
+    return ''.join(random.choices(string.ascii_letters + string.digits, k=22))
+
+
+def sample_payloads() -> dict:
+    """
+    Returns the payloads to benchmark: a bare session and sessions carrying caches.
+    """
+    session = {'email': 'someone@example.com', 'playlist_id': _spotify_id()}
+    playlists = [
+        {'id': _spotify_id(), 'name': f'Playlist {i}', 'owner': {'display_name': 'someone'}}
+        for i in range(200)
+    ]
+    albums = {_spotify_id(): [_spotify_id() for _ in range(12)] for _ in range(100)}
+    return {
+        'session': session,
+        'session+playlists': {**session, 'playlists': playlists},
+        'session+albums': {**session, 'albums': albums},
+    }
+
+
+def main(repeat: int = 2000):
+    """
+    Prints encode/decode time and size of each payload, for both formats.
+    """
+    formats = {
+        'json': (lambda d: json.dumps(d).encode(), json.loads),
+        'swa': (serialization.encode, serialization.decode),
+    }
+    print(f"{'payload':<20}{'format':<8}{'bytes':>10}{'encode µs':>12}{'decode µs':>12}")
+    for name, data in sample_payloads().items():
+        for fmt, (encode, decode) in formats.items():
+            payload = encode(data)
+            encode_time = timeit.timeit(functools.partial(encode, data), number=repeat)
+            decode_time = timeit.timeit(functools.partial(decode, payload), number=repeat)
+            print(f'{name:<20}{fmt:<8}{len(payload):>10}'
+                  f'{encode_time / repeat * 1e6:>12.1f}{decode_time / repeat * 1e6:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
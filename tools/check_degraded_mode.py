@@ -0,0 +1,105 @@
+"""
+Checks that an open Spotify circuit breaker serves the "try again later" page.
+
+A logged in user with an expired access token requests `/run` while the breaker is
+open: refreshing the token is rejected by the breaker, and the user must get the 503
+page from the `degraded_mode` plugin instead of being sent back to the login.
+
+Run from the repository root, it exits with an error if the check fails:
+
+    python -m tools.check_degraded_mode
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import bottle
+import requests
+
+import swa_http
+import swa.session as sws
+from swa.circuit import OPEN
+from swa.spotifyoauthredis import OAUTH_GRANTS, SPOTIFY_BREAKER, spotify_oauth
+
+EMAIL = 'degraded@check.local'
+
+
+def open_breaker():
+    """
+    Opens the Spotify circuit breaker by reporting enough consecutive failures.
+    """
+    def fail():
+        raise requests.ConnectionError('Spotify is down')
+
+    for _ in range(SPOTIFY_BREAKER.failure_threshold):
+        try:
+            SPOTIFY_BREAKER.call(fail)
+        except requests.ConnectionError:
+            pass
+    assert SPOTIFY_BREAKER.state == OPEN
+
+
+def request(path: str, session_id: str) -> tuple:
+    """
+    Sends a GET request to the application, returning the status and headers.
+    """
+    response = bottle.BaseResponse()
+    response.set_cookie('SID', session_id, secret=sws.COOKIE_SECRET)
+    cookie = dict(response.headerlist)['Set-Cookie'].split(';', 1)[0]
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '8080',
+        'HTTP_COOKIE': cookie,
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+    result = {}
+
+    def start_response(status, headers, exc_info=None):  # pylint: disable=unused-argument
+        result.update(status=status, headers=dict(headers))
+
+    b''.join(bottle.default_app()(environ, start_response))
+    return result['status'], result['headers']
+
+
+def main():
+    """
+    Runs the check against files stored in a temporary directory.
+    """
+    os.environ.pop('REDIS_URL', None)
+    os.environ.setdefault('SPOTIPY_CLIENT_ID', 'check')
+    os.environ.setdefault('SPOTIPY_CLIENT_SECRET', 'check')
+    bottle.TEMPLATE_PATH.insert(0, os.path.abspath('views'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs('.cache')
+        spotify_oauth(EMAIL).cache_handler.save_token_to_cache({
+            'access_token': 'expired',
+            'refresh_token': 'refresh',
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+            'expires_at': int(time.time()) - 60,
+            'scope': OAUTH_GRANTS,
+        })
+        sws.session_set_data(sws.SessionData({'email': EMAIL}), 'degraded-check')
+        open_breaker()
+        bottle.install(swa_http.degraded_mode)
+
+        status, headers = request('/run', 'degraded-check')
+
+    print(json.dumps({'status': status, 'location': headers.get('Location')}))
+    if not status.startswith('503') or 'Retry-After' not in headers:
+        sys.exit('Error: the open breaker did not reach the degraded mode page.')
+    print('OK: the open breaker is served the "try again later" page.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""
+A local stand-in for the Spotify accounts service and Web API.
+
+It implements just enough of both for the application to log a user in and run:
+the token exchange, the current user and their playlists, playlist tracks, album
+lookups and the playlist modifications. Every access token is a synthetic user
+with their own playlists, created on first use.
+
+Run from the repository root, then point the application to it with
+SPOTIFY_ACCOUNTS_URL and SPOTIFY_API_URL:
+
+    python -m tools.fake_spotify --port 9090
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from swa.spotifyoauthredis import OAUTH_GRANTS
+
+PAGE_SIZE = 50
+
+
+def fake_id(*parts) -> str:
+    """
+    Returns a stable, Spotify-like, 22 characters base62 ID for the given parts.
+    """
+    digest = int.from_bytes(hashlib.sha256(':'.join(map(str, parts)).encode()).digest(), 'big')
+    alphabet = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    chars = []
+    for _ in range(22):
+        digest, index = divmod(digest, 62)
+        chars.append(alphabet[index])
+    return ''.join(chars)
+
+
+class FakeSpotify:
+    """
+    The state of the fake service: users, their playlists and the album catalog.
+
+    :param playlists_per_user: Amount of playlists each user has, besides "Discover Weekly".
+    :param weekly_tracks: Amount of tracks in each "Discover Weekly".
+    :param latency: Seconds to wait before answering each request.
+    """
+
+    def __init__(self, playlists_per_user: int = 60, weekly_tracks: int = 30,
+                 latency: float = 0.0):
+        self.playlists_per_user = playlists_per_user
+        self.weekly_tracks = weekly_tracks
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._playlists: Dict[str, List[Dict]] = {}
+        self._playlists_by_id: Dict[str, Dict] = {}
+        self._tracks: Dict[str, List[str]] = {}
+
+    def user_playlists(self, user: str) -> List[Dict]:
+        """
+        Returns the playlists of a user, creating them on first access.
+        """
+        with self._lock:
+            if user not in self._playlists:
+                self._playlists[user] = []
+                self._add_playlist(user, 'Discover Weekly', 'Spotify', fake_id(user, 'weekly'))
+                for i in range(self.playlists_per_user):
+                    self._add_playlist(user, f'Playlist {i}', user, fake_id(user, 'playlist', i))
+                self._tracks[fake_id(user, 'weekly')] = [
+                    fake_id('track', user, i) for i in range(self.weekly_tracks)
+                ]
+            return self._playlists[user]
+
+    def create_playlist(self, user: str, name: str) -> Dict:
+        """
+        Creates a new playlist for the user.
+        """
+        self.user_playlists(user)
+        with self._lock:
+            playlist = self._add_playlist(user, name, user, fake_id(user, 'created', name))
+        return {**playlist, 'tracks': {'total': 0}}
+
+    def playlist_tracks(self, playlist_id: str) -> List[str]:
+        """
+        Returns the (mutable) list of track IDs of a playlist.
+        """
+        with self._lock:
+            return self._tracks.setdefault(playlist_id, [])
+
+    def find_playlist(self, playlist_id: str) -> Dict | None:
+        """
+        Returns a playlist object by its ID.
+        """
+        with self._lock:
+            if playlist_id not in self._playlists_by_id:
+                return None
+            total = len(self._tracks.get(playlist_id, []))
+            return {**self._playlists_by_id[playlist_id], 'tracks': {'total': total}}
+
+    @staticmethod
+    def album_of(track_id: str) -> Dict:
+        """
+        Returns the simplified album object of a track, about one album every two tracks.
+        """
+        album_number = int(hashlib.md5(track_id.encode()).hexdigest(), 16) % 5000
+        return FakeSpotify.simplified_album(fake_id('album', album_number))
+
+    @staticmethod
+    def simplified_album(album_id: str) -> Dict:
+        """
+        Returns a simplified album object, all its attributes are derived from its ID.
+        """
+        total_tracks = 1 + int(hashlib.md5(album_id.encode()).hexdigest(), 16) % 16
+        return {
+            'id': album_id,
+            'album_type': 'single' if total_tracks < 4 else 'album',
+            'total_tracks': total_tracks,
+        }
+
+    @staticmethod
+    def album(album_id: str, base_url: str) -> Dict:
+        """
+        Returns a full album object, with the first page of tracks.
+        """
+        album = FakeSpotify.simplified_album(album_id)
+        album['tracks'] = paginate(
+            [{'id': fake_id(album_id, i)} for i in range(album['total_tracks'])],
+            f'{base_url}/v1/albums/{album_id}/tracks', 0, PAGE_SIZE,
+        )
+        return album
+
+    def _add_playlist(self, user: str, name: str, owner: str, playlist_id: str) -> Dict:
+        playlist = {
+            'id': playlist_id,
+            'name': name,
+            'owner': {'id': owner, 'display_name': owner},
+        }
+        self._playlists[user].append(playlist)
+        self._playlists_by_id[playlist_id] = playlist
+        return playlist
+
+
+def paginate(items: list, url: str, offset: int, limit: int) -> Dict:
+    """
+    Returns a Web API paging object for a slice of the given items.
+    """
+    has_next = offset + limit < len(items)
+    return {
+        'items': items[offset:offset + limit],
+        'total': len(items),
+        'limit': limit,
+        'offset': offset,
+        'next': f'{url}?offset={offset + limit}&limit={limit}' if has_next else None,
+    }
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving both the accounts service and the Web API.
+    """
+    server: FakeSpotifyServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles GET requests."""
+        self._dispatch('GET')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles POST requests."""
+        self._dispatch('POST')
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        """Handles DELETE requests."""
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keeps the output quiet, this server is hit thousands of times."""
+
+    def _dispatch(self, method: str):
+        spotify = self.server.spotify
+        if spotify.latency:
+            time.sleep(spotify.latency)
+
+        url = urlsplit(self.path)
+        path = re.sub('/+', '/', url.path).rstrip('/')
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if method == 'POST' and path == '/api/token':
+            self._token(parse_qs(body.decode()))
+            return
+
+        user = self.headers.get('Authorization', '').removeprefix('Bearer ').removeprefix('token-')
+        if not user:
+            self._send(401, {'error': {'status': 401, 'message': 'No token provided'}})
+            return
+
+        try:
+            payload = json.loads(body) if body else None
+            result = self._route(method, path, query, payload, user)
+        except (KeyError, ValueError):
+            result = None
+
+        if result is None:
+            self._send(404, {'error': {'status': 404, 'message': 'Not found'}})
+        else:
+            self._send(200 if method == 'GET' else 201, result)
+
+    def _route(self, method: str, path: str, query: dict, payload, user: str):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-return-statements
+        spotify = self.server.spotify
+        base_url = self.server.base_url
+        offset, limit = int(query.get('offset', 0)), int(query.get('limit', PAGE_SIZE))
+
+        if (method, path) == ('GET', '/v1/me'):
+            return {'id': user, 'display_name': user}
+
+        if (method, path) == ('GET', '/v1/me/playlists'):
+            playlists = [spotify.find_playlist(p['id']) for p in spotify.user_playlists(user)]
+            return paginate(playlists, f'{base_url}/v1/me/playlists', offset, limit)
+
+        if (method, path) == ('GET', '/v1/albums'):
+            return {'albums': [spotify.album(a, base_url) for a in query['ids'].split(',')]}
+
+        if match := re.fullmatch(r'/v1/albums/([^/]+)/tracks', path):
+            return spotify.album(match[1], base_url)['tracks'] if method == 'GET' else None
+
+        if match := re.fullmatch(r'/v1/users/([^/]+)/playlists', path):
+            return spotify.create_playlist(user, payload['name']) if method == 'POST' else None
+
+        if match := re.fullmatch(r'/v1/playlists/([^/]+)', path):
+            return spotify.find_playlist(match[1]) if method == 'GET' else None
+
+        if match := re.fullmatch(r'/v1/playlists/([^/]+)/tracks', path):
+            tracks = spotify.playlist_tracks(match[1])
+            if method == 'POST':
+                tracks.extend(uri.rsplit(':', 1)[-1] for uri in payload)
+            elif method == 'DELETE':
+                removed = {t['uri'].rsplit(':', 1)[-1] for t in payload['tracks']}
+                tracks[:] = [t for t in tracks if t not in removed]
+            else:
+                items = [{'track': {'id': t, 'album': spotify.album_of(t)}} for t in tracks]
+                return paginate(items, f'{base_url}{path}', offset, min(limit, 100))
+            return {'snapshot_id': fake_id(match[1], len(tracks))}
+
+        return None
+
+    def _token(self, form: dict):
+        code = form.get('code', ['anonymous'])[0]
+        self._send(200, {
+            'access_token': f'token-{code}',
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+            'refresh_token': f'refresh-{code}',
+            'scope': OAUTH_GRANTS,
+        })
+
+    def _send(self, status: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server for the fake Spotify service.
+
+    :param address: The (host, port) to listen on, port 0 picks a free one.
+    :param spotify: The state of the fake service.
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, spotify: FakeSpotify):
+        super().__init__(address, FakeSpotifyHandler)
+        self.spotify = spotify
+
+    @property
+    def base_url(self) -> str:
+        """The URL the server is reachable at."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def main():
+    """
+    Runs the fake Spotify service until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--playlists', type=int, default=60, help='Playlists per user.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request.')
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer(
+        (args.host, args.port),
+        FakeSpotify(playlists_per_user=args.playlists, latency=args.latency),
+    )
+    print(f'SPOTIFY_ACCOUNTS_URL={server.base_url}')
+    print(f'SPOTIFY_API_URL={server.base_url}/v1/')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
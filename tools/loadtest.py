@@ -0,0 +1,228 @@
+"""
+Load test for the HTTP application, driving the whole login and run flow.
+
+Synthetic users go through `/login`, `/oauth/callback`, `/run`, `/run/manual-selection`
+and `/run/finished` against a local instance of `swa_http.py`, which talks to the fake
+Spotify service from `tools.fake_spotify`. Each concurrency level reports throughput,
+latency percentiles and error rates per route.
+
+Run from the repository root:
+
+    python -m tools.loadtest --concurrency 1,4,16 --users 64
+
+Sessions and tokens are stored on files by default, pass `--redis-url` to use a
+local Redis instead. To test an instance started separately (eg: behind another
+server), point it to the fake service and pass its address with `--app-url`.
+"""
+
+from __future__ import annotations
+import argparse
+import http.client
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from tools.fake_spotify import FakeSpotify, FakeSpotifyServer
+
+# Route label, latency in seconds and whether the request succeeded.
+Sample = Tuple[str, float, bool]
+
+
+class SyntheticUser:
+    """
+    A browser-like client going through the application flow, keeping its cookies.
+
+    :param app_url: The base URL of the application.
+    :param name: The user name, also used as OAuth code and email.
+    """
+
+    def __init__(self, app_url: str, name: str):
+        self.address = urlsplit(app_url).netloc
+        self.name = name
+        self.cookies = SimpleCookie()
+        self.samples: List[Sample] = []
+
+    def run_flow(self) -> List[Sample]:
+        """
+        Goes through the whole flow, stopping at the first failed request.
+        """
+        steps = (
+            ('GET', '/login', None),
+            ('POST', '/login', {'email': f'{self.name}@loadtest.local'}),
+            ('GET', f'/oauth/callback?code={self.name}', None),
+            ('GET', '/run', None),
+            ('GET', '/run/manual-selection', None),
+            ('GET', '/run/finished', None),
+        )
+        for method, path, form in steps:
+            if not self.request(method, path, form):
+                break
+        return self.samples
+
+    def request(self, method: str, path: str, form: dict | None = None) -> bool:
+        """
+        Sends a request without following redirects, records and returns its outcome.
+        """
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={m.value}' for k, m in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        label = f"{method} {path.split('?', maxsplit=1)[0]}"
+        start = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection(self.address, timeout=60)
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            self.samples.append((label, time.perf_counter() - start, False))
+            return False
+
+        for cookie in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(cookie)
+        location = response.getheader('Location', '')
+        # Redirects back to the login or error pages are application errors.
+        success = response.status < 400 and '/login?' not in location and 'error' not in location
+        self.samples.append((label, time.perf_counter() - start, success))
+        return success
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of the given values.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_level(app_url: str, concurrency: int, users: int, level: int) -> Tuple[List[Sample], float]:
+    """
+    Runs the flow for the given amount of users, `concurrency` at a time.
+
+    :return: The samples and the elapsed wall time.
+    """
+    names = [f'loadtest-{level}-{i}' for i in range(users)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        flows = executor.map(lambda name: SyntheticUser(app_url, name).run_flow(), names)
+        samples = [sample for flow in flows for sample in flow]
+    return samples, time.perf_counter() - start
+
+
+def report(concurrency: int, samples: List[Sample], elapsed: float):
+    """
+    Prints the statistics of a concurrency level.
+    """
+    by_route: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+
+    print(f'\n== Concurrency {concurrency}: {len(samples)} requests in {elapsed:.2f}s, '
+          f'{len(samples) / elapsed:.1f} req/s')
+    print(f"{'route':<30}{'count':>7}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, route_samples in by_route.items():
+        latencies = [latency * 1000 for _, latency, _ in route_samples]
+        errors = sum(1 for _, _, success in route_samples if not success)
+        print(f'{route:<30}{len(route_samples):>7}{errors / len(route_samples):>9.1%}'
+              f'{percentile(latencies, .50):>10.1f}{percentile(latencies, .95):>10.1f}'
+              f'{percentile(latencies, .99):>10.1f}')
+
+
+def start_app(port: int, spotify_url: str, redis_url: str | None) -> subprocess.Popen:
+    """
+    Starts `swa_http.py` as a subprocess, talking to the fake Spotify service.
+    """
+    env = {
+        **os.environ,
+        'APP_ENV': 'Prod',
+        'LISTEN_IP': '127.0.0.1',
+        'PORT': str(port),
+        'SPOTIPY_CLIENT_ID': 'loadtest',
+        'SPOTIPY_CLIENT_SECRET': 'loadtest',
+        'SPOTIFY_ACCOUNTS_URL': spotify_url,
+        'SPOTIFY_API_URL': f'{spotify_url}/v1/',
+    }
+    env.pop('REDIS_URL', None)
+    if redis_url:
+        env['REDIS_URL'] = redis_url
+
+    # pylint: disable-next=consider-using-with
+    return subprocess.Popen(
+        [sys.executable, 'swa_http.py'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for(app_url: str, timeout: float = 15):
+    """
+    Waits until the application accepts connections.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(urlsplit(app_url).netloc, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(.1)
+    raise RuntimeError(f'Application not reachable at {app_url}')
+
+
+def main():
+    """
+    Runs the load test at each concurrency level.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--concurrency', default='1,2,4,8,16',
+                        help='Comma separated concurrency levels.')
+    parser.add_argument('--users', type=int, default=32, help='Synthetic users per level.')
+    parser.add_argument('--app-url', help='Use an already running application.')
+    parser.add_argument('--app-port', type=int, default=8089)
+    parser.add_argument('--spotify-port', type=int, default=0)
+    parser.add_argument('--spotify-latency', type=float, default=0.0,
+                        help='Seconds the fake Spotify waits on every request.')
+    parser.add_argument('--playlists', type=int, default=60, help='Playlists per user.')
+    parser.add_argument('--redis-url', help='Redis to store sessions and tokens in.')
+    args = parser.parse_args()
+
+    spotify = FakeSpotifyServer(
+        ('127.0.0.1', args.spotify_port),
+        FakeSpotify(playlists_per_user=args.playlists, latency=args.spotify_latency),
+    )
+    threading.Thread(target=spotify.serve_forever, daemon=True).start()
+    print(f'Fake Spotify at: {spotify.base_url}')
+
+    app = None
+    app_url = args.app_url
+    if not app_url:
+        app = start_app(args.app_port, spotify.base_url, args.redis_url)
+        app_url = f'http://127.0.0.1:{args.app_port}'
+
+    try:
+        wait_for(app_url)
+        for level, concurrency in enumerate(int(c) for c in args.concurrency.split(',')):
+            samples, elapsed = run_level(app_url, concurrency, args.users, level)
+            report(concurrency, samples, elapsed)
+    finally:
+        if app:
+            app.terminate()
+            app.wait()
+        spotify.shutdown()
+
+
+if __name__ == '__main__':
+    main()